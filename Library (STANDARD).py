@@ -24,10 +24,88 @@
 import easygui as eg
 import sqlite3
 import os
+# re and unicodedata help us tidy up names when we check for duplicates.
+import re
+import unicodedata
+# OrderedDict remembers which saved book list was used least recently.
+from collections import OrderedDict
+
+
+# Duplicate Check Helpers
+def author_key(name):
+    """
+    Turns an author's name into a short key: surname plus first initial.
+    "J.K. Rowling", "JK Rowling" and "Rowling, J. K." all become "rowling|j",
+    so we can spot the same author typed in different ways.
+    """
+    # Removes accents (é -> e) so they don't make two names look different.
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    # "Surname, First" is flipped around to "First Surname".
+    if "," in text:
+        last, _, first = text.partition(",")
+        text = first + " " + last
+    words = re.findall(r"[A-Za-z]+", text)
+    if not words:
+        return ""
+    initial = words[0][0].lower() if len(words) > 1 else ""
+    return f"{words[-1].lower()}|{initial}"
+
+
+def title_key(title):
+    """
+    Turns a title into a simple lowercase form without punctuation or a leading
+    "The", so "The Hobbit" and "hobbit" are recognised as the same book.
+    """
+    text = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode().lower()
+    words = re.findall(r"[a-z0-9]+", text.replace("&", " and ").replace("'", ""))
+    if words and words[0] in ("the", "a", "an"):
+        words = words[1:]
+    return " ".join(words)
+
+
+# Render Cache
+# Formatted book lists we've already built, so pressing the same button twice
+# doesn't query and re-format the whole library again if nothing has changed.
+RENDER_CACHE = OrderedDict()
+RENDER_CACHE_MAX_CHARS = 2_000_000
+
+
+def database_version(cursor):
+    """
+    Gives back a value that changes whenever the books change. PRAGMA data_version
+    moves when another program saves changes, and total_changes counts our own saves.
+    Neither of them has to read the books table.
+    """
+    cursor.execute("PRAGMA data_version")
+    return cursor.fetchone()[0], cursor.connection.total_changes
+
+
+def cached_render(cursor, view, filter_key, render):
+    """
+    Returns the formatted list for a view (and search filter). If the database hasn't
+    changed since we last built it, we hand back the saved copy straight away.
+    """
+    version = database_version(cursor)
+    key = (view, filter_key, version)
+    if key in RENDER_CACHE:
+        RENDER_CACHE.move_to_end(key) # Marks it as recently used.
+        return RENDER_CACHE[key]
+
+    # Lists built before the last change are out of date, so we throw them away.
+    for old_key in [k for k in RENDER_CACHE if k[2] != version]:
+        del RENDER_CACHE[old_key]
+
+    display_text = render(cursor)
+    RENDER_CACHE[key] = display_text
+
+    # Keeps memory in check by dropping the least recently used lists first.
+    while len(RENDER_CACHE) > 1 and sum(len(v or "") for v in RENDER_CACHE.values()) > RENDER_CACHE_MAX_CHARS:
+        RENDER_CACHE.popitem(last=False)
+    return display_text
 
 
 # Database setup here
-def setup_database():
+def setup_database(db_path='Library_Database.db'):
     """
     Sets up the connection to our library database. If it doesn't exist yet,
     it creates the database file and the necessary table for our books.
@@ -36,7 +114,7 @@ def setup_database():
     try:
         # Tries to connect to our 'Library_Database.db' file.
         # If the file isn't there, Python just creates it for us.
-        conn = sqlite3.connect('Library_Database.db')
+        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
         # This command creates the 'Library_Database' table if it's not already there.
@@ -52,6 +130,18 @@ def setup_database():
             )
         ''')
 
+        # Older database files don't have the duplicate-check keys yet, so we add them
+        # and fill them in. The index lets add_book check for duplicates instantly.
+        cursor.execute("PRAGMA table_info(Library_Database)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if "Author_Key" not in columns:
+            cursor.execute("ALTER TABLE Library_Database ADD COLUMN Author_Key TEXT")
+            cursor.execute("ALTER TABLE Library_Database ADD COLUMN Title_Key TEXT")
+        cursor.execute("SELECT rowid, Author, Title FROM Library_Database WHERE Author_Key IS NULL")
+        keys = [(author_key(a), title_key(t), book_id) for book_id, a, t in cursor.fetchall()]
+        cursor.executemany("UPDATE Library_Database SET Author_Key = ?, Title_Key = ? WHERE rowid = ?", keys)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_author_title ON Library_Database(Author_Key, Title_Key)")
+
         # Saves all the changes we just made (like creating the table).
         conn.commit()
         return conn, cursor
@@ -123,12 +213,29 @@ def add_book(conn, cursor):
         return
 
     try:
+        # Before saving, we check for duplicates using the Author_Key/Title_Key index,
+        # so this stays quick no matter how many books are in the library.
+        Author_Key, Title_Key = author_key(Author), title_key(Title)
+        cursor.execute("SELECT Author, Title FROM Library_Database WHERE Author_Key = ? AND Title_Key = ? LIMIT 1",
+                       (Author_Key, Title_Key))
+        existing = cursor.fetchone()
+        if existing:
+            if not eg.ynbox(f"'{existing[1]}' by {existing[0]} is already in the library.\n\nAdd it anyway?", "Possible Duplicate"):
+                return
+        else:
+            # Same author typed a different way? Offer the spelling we already have.
+            cursor.execute("SELECT Author FROM Library_Database WHERE Author_Key = ? AND Author != ? LIMIT 1",
+                           (Author_Key, Author))
+            existing = cursor.fetchone()
+            if existing and eg.ynbox(f"Did you mean the existing author '{existing[0]}'?", "Similar Author"):
+                Author = existing[0]
+
         # Adds the new book to our 'bookshelf' (the database table).
         # We use a special `?` syntax to keep things safe from bad data.
         cursor.execute('''
-            INSERT INTO Library_Database (Author, Title, Genre, Date_Published, Pages)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (Author, Title, Genre, Date_Published, Pages if Pages else None))
+            INSERT INTO Library_Database (Author, Title, Genre, Date_Published, Pages, Author_Key, Title_Key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (Author, Title, Genre, Date_Published, Pages if Pages else None, Author_Key, Title_Key))
         conn.commit() # Saves the new book for good.
         eg.msgbox(f"Book '{Title}' added successfully!", "Success")
 
@@ -145,21 +252,31 @@ def show_books(cursor):
     It's like looking at the contents of our whole library at once.
     """
     try:
-        # Grabs all the book information from our table.
-        cursor.execute("SELECT Author, Title, Genre, Date_Published, Pages FROM Library_Database ORDER BY Author, Title")
-        rows = cursor.fetchall()
+        # Grabs the formatted book list (from the cache if nothing has changed).
+        display_text = cached_render(cursor, "all", None, load_all_books)
 
-        if not rows:
+        if display_text is None:
             # If the database is empty, we'll let the user know.
             eg.msgbox("No books found in the database.", "Book List")
             return
         
-        display_book_results(rows, "All Books")
+        display_book_results(display_text, "All Books")
 
     except sqlite3.Error as e:
         # Something went wrong while trying to get the book list.
         eg.exceptionbox(msg=f"Failed to retrieve books: {e}", title="Database Error")
 
+def load_all_books(cursor):
+    """Grabs all the book information from our table and formats it (None if empty)."""
+    cursor.execute("SELECT Author, Title, Genre, Date_Published, Pages FROM Library_Database ORDER BY Author, Title")
+    return format_book_results(cursor.fetchall())
+
+# One full query per searchable column (the column comes from a controlled buttonbox).
+SEARCH_QUERIES = {
+    "Title": "SELECT Author, Title, Genre, Date_Published, Pages FROM Library_Database WHERE Title LIKE ? ORDER BY Author, Title",
+    "Author": "SELECT Author, Title, Genre, Date_Published, Pages FROM Library_Database WHERE Author LIKE ? ORDER BY Author, Title",
+}
+
 # --- New Function to Search Books ---
 def search_books(cursor):
     """
@@ -180,29 +297,38 @@ def search_books(cursor):
         return
 
     try:
-        # Construct the safe SQL query. We use the '?' placeholder for the value,
-        # and format the column name directly since it comes from a controlled buttonbox.
-        # Note: LIKE is case-insensitive by default in SQLite for ASCII characters.
-        query = f"SELECT Author, Title, Genre, Date_Published, Pages FROM Library_Database WHERE {search_field} LIKE ? ORDER BY Author, Title"
-        
-        # We use the pattern exactly as entered by the user (including any % or _)
-        cursor.execute(query, (search_pattern,))
-        rows = cursor.fetchall()
+        # Repeating the same search on an unchanged library comes straight from the cache.
+        display_text = cached_render(cursor, "search", (search_field, search_pattern),
+                                     lambda cursor: load_search_results(cursor, search_field, search_pattern))
 
-        if not rows:
+        if display_text is None:
             eg.msgbox(f"No books found matching '{search_pattern}' in {search_field}.", "Search Results")
             return
 
-        display_book_results(rows, f"Search Results for '{search_pattern}'")
+        display_book_results(display_text, f"Search Results for '{search_pattern}'")
 
     except sqlite3.Error as e:
         eg.exceptionbox(msg=f"Failed to search books: {e}", title="Database Error")
 
-# --- Helper Function for Displaying Results ---
-def display_book_results(rows, box_title):
+def load_search_results(cursor, search_field, search_pattern):
+    """Runs one search and formats the matching books (None if nothing matched)."""
+    # Pick the safe SQL query for the chosen column. We use the '?' placeholder for the value,
+    # and keep one complete query per column so check_query_plans.py can see every statement.
+    # Note: LIKE is case-insensitive by default in SQLite for ASCII characters.
+    query = SEARCH_QUERIES[search_field]
+
+    # We use the pattern exactly as entered by the user (including any % or _)
+    cursor.execute(query, (search_pattern,))
+    return format_book_results(cursor.fetchall())
+
+# --- Helper Functions for Displaying Results ---
+def format_book_results(rows):
     """
-    A helper function to format and display the book data.
+    A helper function to format the book data into a neat table (None if there are no rows).
     """
+    if not rows:
+        return None
+
     # Sets up the heading for our list, making it look clean and organized.
     display_text = f"{'Author':<30}{'Title':<40}{'Genre':<35}{'Date Published':<25}{'Pages':<10}\n"
     display_text += "=" * 150 + "\n"
@@ -211,6 +337,13 @@ def display_book_results(rows, box_title):
     for Author, Title, Genre, Date_Published, Pages in rows:
         display_text += f"{Author:<30}{Title:<40}{Genre or '':<35}{Date_Published or '':<25}{str(Pages or ''):<10}\n"
 
+    return display_text
+
+
+def display_book_results(display_text, box_title):
+    """
+    A helper function to display the formatted book data.
+    """
     # Displays the entire list of books in a special scrollable text box.
     eg.codebox("All Books", box_title, display_text)
 
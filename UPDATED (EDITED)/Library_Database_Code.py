@@ -2,6 +2,11 @@ import sqlite3
 import easygui as eg
 import re
 import datetime
+import unicodedata
+from collections import OrderedDict
+
+# How long a book can be borrowed before it is overdue.
+LOAN_PERIOD_DAYS = 14
 
 # ==========================================================
 # Helper Functions (validation)
@@ -53,14 +58,110 @@ def non_empty_multenterbox(msg, title, fields):
             continue
         return values
 
+def add_missing_column(cursor, table, column, definition):
+    """
+    Add a column to an existing table (older database files) if it isn't there yet.
+    Returns True if the column was added.
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [r[1] for r in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
+def due_date_for(loan_date):
+    """Due date for a loan made on loan_date (YYYY-MM-DD)."""
+    loaned = datetime.datetime.strptime(loan_date, "%Y-%m-%d")
+    return (loaned + datetime.timedelta(days=LOAN_PERIOD_DAYS)).strftime("%Y-%m-%d")
+
+def name_tokens(name):
+    """Split a name into lowercase ASCII word tokens ("Rowling, J. K." -> j, k, rowling)."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    if "," in text:
+        last, _, first = text.partition(",")
+        text = first + " " + last
+    words = re.findall(r"[A-Za-z]+", text)
+    tokens = []
+    for position, word in enumerate(words):
+        # "JK" before the surname is written initials, so treat it like "J. K."
+        # The last word is the surname even in capitals ("Harper LEE", "AMY TAN").
+        if word.isupper() and len(word) <= 3 and position < len(words) - 1:
+            tokens.extend(word.lower())
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+def author_name_key(name):
+    """
+    Blocking key for an author: surname plus first initial.
+    "J.K. Rowling", "JK Rowling" and "Rowling, J. K." all give "rowling|j".
+    """
+    tokens = name_tokens(name)
+    if not tokens:
+        return ""
+    initial = tokens[0][0] if len(tokens) > 1 else ""
+    return f"{tokens[-1]}|{initial}"
+
+def title_key(title):
+    """Normalised title used to spot the same book entered twice."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode().lower()
+    text = text.replace("&", " and ")
+    words = re.findall(r"[a-z0-9]+", text.replace("'", ""))
+    if words and words[0] in ("the", "a", "an"):
+        words = words[1:]
+    return " ".join(words)
+
+# ==========================================================
+# Render Cache
+# ==========================================================
+
+# Formatted listings keyed by (view, filter, database version), least recently used first.
+RENDER_CACHE = OrderedDict()
+RENDER_CACHE_MAX_CHARS = 2_000_000
+
+def database_version(cursor):
+    """
+    A value that changes whenever the data changes. PRAGMA data_version moves when
+    another connection commits; total_changes counts this connection's own writes.
+    Neither of them reads a table.
+    """
+    cursor.execute("PRAGMA data_version")
+    return cursor.fetchone()[0], cursor.connection.total_changes
+
+def cached_render(cursor, view, filter_key, render):
+    """
+    Return render(cursor) for a view/filter, reusing the saved text while the
+    database is unchanged. Listings from older versions are dropped, and the
+    least recently used ones are evicted to stay under RENDER_CACHE_MAX_CHARS.
+    """
+    version = database_version(cursor)
+    key = (view, filter_key, version)
+    if key in RENDER_CACHE:
+        RENDER_CACHE.move_to_end(key)
+        return RENDER_CACHE[key]
+
+    for old_key in [k for k in RENDER_CACHE if k[2] != version]:
+        del RENDER_CACHE[old_key]
+
+    display = render(cursor)
+    RENDER_CACHE[key] = display
+    while len(RENDER_CACHE) > 1 and sum(len(v or "") for v in RENDER_CACHE.values()) > RENDER_CACHE_MAX_CHARS:
+        RENDER_CACHE.popitem(last=False)
+    return display
+
 # ==========================================================
 # Database Setup
 # ==========================================================
 
-def connect_db():
-    conn = sqlite3.connect("library_database.db")
+def connect_db(db_path="library_database.db"):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    # WAL mode lets report/export jobs read while this program keeps writing.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # The schema declares foreign keys, but SQLite only enforces them when asked.
+    cursor.execute("PRAGMA foreign_keys = ON")
+
     # Verify all tables exist
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     existing = [r[0] for r in cursor.fetchall()]
@@ -84,6 +185,7 @@ def connect_db():
                 Date_Published TEXT,
                 Pages INTEGER,
                 Author_ID INTEGER,
+                ISBN TEXT,
                 FOREIGN KEY (Author_ID) REFERENCES Authors(Author_ID)
             )
         """)
@@ -106,6 +208,7 @@ def connect_db():
                 Borrower_ID INTEGER,
                 Loan_Date TEXT,
                 Return_Date TEXT,
+                Due_Date TEXT,
                 FOREIGN KEY (Book_ID) REFERENCES Library_database(Book_ID),
                 FOREIGN KEY (Borrower_ID) REFERENCES Borrowers(Borrower_ID)
             )
@@ -118,13 +221,244 @@ def connect_db():
                 Book_ID INTEGER,
                 Location_Name TEXT,
                 Copies INTEGER DEFAULT 1,
+                Barcode TEXT,
                 FOREIGN KEY (Book_ID) REFERENCES Library_database(Book_ID)
             )
         """)
 
+    # ISBN / barcode columns (older databases were created without them).
+    # The unique indexes make a scanned code a single indexed lookup.
+    add_missing_column(cursor, "Library_database", "ISBN", "TEXT")
+    add_missing_column(cursor, "Book_Locations", "Barcode", "TEXT")
+
+    # Due dates, with a partial index over open loans only, so finding what is
+    # due never has to look at returned loans. Older loans get the default period.
+    if add_missing_column(cursor, "Loans", "Due_Date", "TEXT"):
+        cursor.execute("UPDATE Loans SET Due_Date = date(Loan_Date, ?) WHERE Due_Date IS NULL",
+                       (f"+{LOAN_PERIOD_DAYS} days",))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_open_due ON Loans(Due_Date) WHERE Return_Date IS NULL")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_library_isbn ON Library_database(ISBN)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_barcode ON Book_Locations(Barcode)")
+
+    # Author name keys for duplicate detection (filled in for older rows).
+    add_missing_column(cursor, "Authors", "Name_Key", "TEXT")
+    cursor.execute("SELECT Author_ID, Author_Name FROM Authors WHERE Name_Key IS NULL")
+    missing_keys = [(author_name_key(name), aid) for aid, name in cursor.fetchall()]
+    cursor.executemany("UPDATE Authors SET Name_Key = ? WHERE Author_ID = ?", missing_keys)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_authors_name_key ON Authors(Name_Key)")
+
+    # Indexes on the foreign key columns, so lookups and merges by ID don't scan.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_library_author ON Library_database(Author_ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_book ON Loans(Book_ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_locations_book ON Book_Locations(Book_ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_borrower ON Loans(Borrower_ID)")
+
+    # Where each batch job got up to last time (e.g. the last Loan_ID it processed).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Job_Watermarks (
+            Job TEXT PRIMARY KEY,
+            Last_ID INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # "Borrowers who took this also took..." (filled in by recommendations.py).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Co_Borrowing (
+            Book_A INTEGER NOT NULL,
+            Book_B INTEGER NOT NULL,
+            Borrowers INTEGER NOT NULL,
+            PRIMARY KEY (Book_A, Book_B)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Recommendations (
+            Book_ID INTEGER NOT NULL,
+            Rank INTEGER NOT NULL,
+            Recommended_ID INTEGER NOT NULL,
+            Score INTEGER NOT NULL,
+            PRIMARY KEY (Book_ID, Rank)
+        ) WITHOUT ROWID
+    """)
+
+    # Running totals kept up to date by triggers (seeded from the tables the first time).
+    if "Library_Stats" not in existing:
+        cursor.execute("""
+            CREATE TABLE Library_Stats (
+                Stat_Group TEXT NOT NULL,
+                Stat_Key TEXT NOT NULL,
+                Value INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (Stat_Group, Stat_Key)
+            ) WITHOUT ROWID
+        """)
+        create_stats_triggers(cursor)
+        reconcile_stats(conn, cursor)
+
+    # Rows updated (or parents deleted) since the last integrity check,
+    # so integrity_check.py --incremental only re-checks those.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Integrity_Changes (
+            Table_Name TEXT NOT NULL,
+            Row_ID INTEGER NOT NULL,
+            PRIMARY KEY (Table_Name, Row_ID)
+        ) WITHOUT ROWID
+    """)
+    create_change_log_triggers(cursor)
+
     conn.commit()
     return conn, cursor
 
+# ==========================================================
+# Job Watermarks (shared by the batch jobs)
+# ==========================================================
+
+def get_watermark(cursor, job):
+    """Last ID the job got up to, or 0 if it has never run."""
+    cursor.execute("SELECT Last_ID FROM Job_Watermarks WHERE Job = ?", (job,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def set_watermark(cursor, job, last_id):
+    """Save the job's watermark (not committed, so it can go in the job's own transaction)."""
+    cursor.execute("""
+        INSERT INTO Job_Watermarks (Job, Last_ID) VALUES (?, ?)
+        ON CONFLICT (Job) DO UPDATE SET Last_ID = excluded.Last_ID
+    """, (job, last_id))
+
+# ==========================================================
+# Statistics (trigger-maintained counts)
+# ==========================================================
+
+def stat_change(group, key, delta):
+    """SQL (for a trigger body) that adds delta to one Library_Stats row."""
+    return f"""
+        INSERT INTO Library_Stats (Stat_Group, Stat_Key, Value) VALUES ('{group}', {key}, {delta})
+        ON CONFLICT (Stat_Group, Stat_Key) DO UPDATE SET Value = Value + excluded.Value;"""
+
+def create_stats_triggers(cursor):
+    """Keep Library_Stats in step with every insert, update and delete."""
+    triggers = {
+        "stats_authors_insert": ("AFTER INSERT ON Authors", stat_change("total", "'authors'", "1")),
+        "stats_authors_delete": ("AFTER DELETE ON Authors", stat_change("total", "'authors'", "-1")),
+        "stats_borrowers_insert": ("AFTER INSERT ON Borrowers", stat_change("total", "'borrowers'", "1")),
+        "stats_borrowers_delete": ("AFTER DELETE ON Borrowers", stat_change("total", "'borrowers'", "-1")),
+        "stats_books_insert": ("AFTER INSERT ON Library_database",
+                               stat_change("total", "'books'", "1")
+                               + stat_change("genre", "COALESCE(NEW.Genre, '')", "1")),
+        "stats_books_delete": ("AFTER DELETE ON Library_database",
+                               stat_change("total", "'books'", "-1")
+                               + stat_change("genre", "COALESCE(OLD.Genre, '')", "-1")),
+        "stats_books_genre": ("AFTER UPDATE OF Genre ON Library_database",
+                              stat_change("genre", "COALESCE(OLD.Genre, '')", "-1")
+                              + stat_change("genre", "COALESCE(NEW.Genre, '')", "1")),
+        "stats_loans_insert": ("AFTER INSERT ON Loans",
+                               stat_change("total", "'loans'", "1")
+                               + stat_change("total", "'open_loans'", "(NEW.Return_Date IS NULL)")),
+        "stats_loans_delete": ("AFTER DELETE ON Loans",
+                               stat_change("total", "'loans'", "-1")
+                               + stat_change("total", "'open_loans'", "-(OLD.Return_Date IS NULL)")),
+        "stats_loans_return": ("AFTER UPDATE OF Return_Date ON Loans",
+                               stat_change("total", "'open_loans'",
+                                           "(NEW.Return_Date IS NULL) - (OLD.Return_Date IS NULL)")),
+        "stats_locations_insert": ("AFTER INSERT ON Book_Locations",
+                                   stat_change("location", "COALESCE(NEW.Location_Name, '')", "COALESCE(NEW.Copies, 0)")),
+        "stats_locations_delete": ("AFTER DELETE ON Book_Locations",
+                                   stat_change("location", "COALESCE(OLD.Location_Name, '')", "-COALESCE(OLD.Copies, 0)")),
+        "stats_locations_update": ("AFTER UPDATE OF Location_Name, Copies ON Book_Locations",
+                                   stat_change("location", "COALESCE(OLD.Location_Name, '')", "-COALESCE(OLD.Copies, 0)")
+                                   + stat_change("location", "COALESCE(NEW.Location_Name, '')", "COALESCE(NEW.Copies, 0)")),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+def create_change_log_triggers(cursor):
+    """Log updated rows and deleted parent rows into Integrity_Changes."""
+    for table, key, event in [("Loans", "Loan_ID", "UPDATE"),
+                              ("Book_Locations", "Location_ID", "UPDATE"),
+                              ("Library_database", "Book_ID", "UPDATE"),
+                              ("Library_database", "Book_ID", "DELETE"),
+                              ("Borrowers", "Borrower_ID", "DELETE"),
+                              ("Authors", "Author_ID", "DELETE")]:
+        row = "OLD" if event == "DELETE" else "NEW"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS changes_{table.lower()}_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO Integrity_Changes (Table_Name, Row_ID) VALUES ('{table}', {row}.{key});
+            END
+        """)
+
+def count_stats(cursor):
+    """Recompute every statistic from scratch: {(group, key): value}."""
+    stats = {}
+    for key, query in [("books", "SELECT COUNT(*) FROM Library_database"),
+                       ("authors", "SELECT COUNT(*) FROM Authors"),
+                       ("borrowers", "SELECT COUNT(*) FROM Borrowers"),
+                       ("loans", "SELECT COUNT(*) FROM Loans")]:
+        cursor.execute(query)
+        stats[("total", key)] = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM Loans WHERE Return_Date IS NULL")
+    stats[("total", "open_loans")] = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(Genre, ''), COUNT(*) FROM Library_database GROUP BY COALESCE(Genre, '')")
+    for genre, count in cursor.fetchall():
+        stats[("genre", genre)] = count
+    cursor.execute("""
+        SELECT COALESCE(Location_Name, ''), SUM(COALESCE(Copies, 0))
+        FROM Book_Locations GROUP BY COALESCE(Location_Name, '')
+    """)
+    for location, copies in cursor.fetchall():
+        stats[("location", location)] = copies
+    return stats
+
+def reconcile_stats(conn, cursor):
+    """
+    Recompute the statistics, rewrite Library_Stats and return the rows that
+    had drifted as a list of (group, key, stored value, real value).
+    """
+    real = count_stats(cursor)
+    cursor.execute("SELECT Stat_Group, Stat_Key, Value FROM Library_Stats")
+    stored = {(g, k): v for g, k, v in cursor.fetchall()}
+
+    drift = []
+    for group_key in sorted(set(real) | set(stored)):
+        if real.get(group_key, 0) != stored.get(group_key, 0):
+            drift.append(group_key + (stored.get(group_key, 0), real.get(group_key, 0)))
+
+    with conn:
+        cursor.execute("DELETE FROM Library_Stats")
+        cursor.executemany("INSERT INTO Library_Stats (Stat_Group, Stat_Key, Value) VALUES (?, ?, ?)",
+                           [group_key + (value,) for group_key, value in real.items()])
+    return drift
+
+def status_summary(cursor):
+    """One-line counts for the main menu, read straight from Library_Stats."""
+    cursor.execute("SELECT Stat_Key, Value FROM Library_Stats WHERE Stat_Group = 'total'")
+    totals = dict(cursor.fetchall())
+    return (f"Books: {totals.get('books', 0)}   Authors: {totals.get('authors', 0)}   "
+            f"Borrowers: {totals.get('borrowers', 0)}   Open loans: {totals.get('open_loans', 0)}")
+
+def view_statistics(cursor):
+    cursor.execute("SELECT Stat_Group, Stat_Key, Value FROM Library_Stats WHERE Stat_Group IN ('genre', 'location') AND Value != 0")
+    rows = cursor.fetchall()
+    display = status_summary(cursor) + "\n\n"
+    display += f"{'Books per Genre':<35}{'Count':<7}\n" + "="*45 + "\n"
+    for group, key, value in rows:
+        if group == "genre":
+            display += f"{(key or '(none)'):<35}{value:<7}\n"
+    display += f"\n{'Copies per Location':<35}{'Copies':<7}\n" + "="*45 + "\n"
+    for group, key, value in rows:
+        if group == "location":
+            display += f"{(key or '(none)'):<35}{value:<7}\n"
+    eg.codebox("Statistics", "Library Statistics", display)
+
+def reconcile_statistics(conn, cursor):
+    drift = reconcile_stats(conn, cursor)
+    if not drift:
+        eg.msgbox("All statistics match the tables. No drift found.", "Reconcile Statistics")
+        return
+    display = f"{'Group':<10}{'Key':<30}{'Stored':<10}{'Actual':<10}\n" + "="*60 + "\n"
+    for group, key, stored, actual in drift:
+        display += f"{group:<10}{(key or ''):<30}{stored:<10}{actual:<10}\n"
+    eg.codebox("Drift was found and the statistics have been recomputed.", "Reconcile Statistics", display)
+
 # ==========================================================
 # Add / View Functions
 # ==========================================================
@@ -136,19 +470,35 @@ def add_author(conn, cursor):
     if not values:
         return
     name, country = values
-    cursor.execute("INSERT INTO Authors (Author_Name, Country) VALUES (?, ?)", (name, country))
+
+    # Quick duplicate check through the Name_Key index.
+    name_key = author_name_key(name)
+    cursor.execute("SELECT Author_Name FROM Authors WHERE Name_Key = ?", (name_key,))
+    similar = [r[0] for r in cursor.fetchall()]
+    if similar:
+        listing = "\n".join(similar)
+        if not eg.ynbox(f"Similar author(s) already exist:\n\n{listing}\n\nAdd '{name}' anyway?", "Possible Duplicate"):
+            return
+
+    cursor.execute("INSERT INTO Authors (Author_Name, Country, Name_Key) VALUES (?, ?, ?)", (name, country, name_key))
     conn.commit()
     eg.msgbox(f"Author '{name}' added successfully.", "Success")
 
-def view_authors(cursor):
+def render_authors(cursor):
     cursor.execute("SELECT Author_Name, Country FROM Authors")
     rows = cursor.fetchall()
     if not rows:
-        eg.msgbox("No authors found.", "Authors")
-        return
+        return None
     display = f"{'Author Name':<30}{'Country':<20}\n" + "="*50 + "\n"
     for name, country in rows:
         display += f"{name:<30}{(country or ''):<20}\n"
+    return display
+
+def view_authors(cursor):
+    display = cached_render(cursor, "authors", None, render_authors)
+    if display is None:
+        eg.msgbox("No authors found.", "Authors")
+        return
     eg.codebox("Authors", "Author List", display)
 
 def add_book(conn, cursor):
@@ -192,14 +542,27 @@ def add_book(conn, cursor):
         eg.msgbox("Pages must be a positive integer.", "Invalid Input")
         return
 
-    cursor.execute("""
-        INSERT INTO Library_database (Title, Genre, Date_Published, Pages, Author_ID)
-        VALUES (?, ?, ?, ?, ?)
-    """, (title, genre, date_published, int(pages), author_id))
+    # Warn if this author already has a book with the same (normalised) title.
+    cursor.execute("SELECT Title FROM Library_database WHERE Author_ID = ?", (author_id,))
+    if any(title_key(t) == title_key(title) for (t,) in cursor.fetchall()):
+        if not eg.ynbox(f"'{title}' by {author_choice} is already in the library.\n\nAdd it anyway?", "Possible Duplicate"):
+            return
+
+    isbn = eg.enterbox("Enter ISBN / barcode (optional):", "ISBN")
+    isbn = isbn.strip() if isbn else None
+
+    try:
+        cursor.execute("""
+            INSERT INTO Library_database (Title, Genre, Date_Published, Pages, Author_ID, ISBN)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (title, genre, date_published, int(pages), author_id, isbn or None))
+    except sqlite3.IntegrityError:
+        eg.msgbox(f"ISBN '{isbn}' is already used by another book.", "Duplicate ISBN")
+        return
     conn.commit()
     eg.msgbox(f"Book '{title}' added successfully.", "Success")
 
-def view_books(cursor):
+def render_books(cursor):
     cursor.execute("""
         SELECT L.Book_ID, L.Title, L.Genre, L.Date_Published, L.Pages, A.Author_Name
         FROM Library_database L
@@ -208,11 +571,17 @@ def view_books(cursor):
     """)
     rows = cursor.fetchall()
     if not rows:
-        eg.msgbox("No books found.", "Books")
-        return
+        return None
     display = f"{'ID':<4}{'Title':<30}{'Genre':<12}{'Published':<12}{'Pages':<7}{'Author':<20}\n" + "="*95 + "\n"
     for bid, t, g, d, p, a in rows:
         display += f"{(bid or ''):<4}{(t or ''):<30}{(g or ''):<12}{(d or ''):<12}{(p or ''):<7}{(a or ''):<20}\n"
+    return display
+
+def view_books(cursor):
+    display = cached_render(cursor, "books", None, render_books)
+    if display is None:
+        eg.msgbox("No books found.", "Books")
+        return
     eg.codebox("Books", "Book List", display)
 
 def add_borrower(conn, cursor):
@@ -231,15 +600,21 @@ def add_borrower(conn, cursor):
     conn.commit()
     eg.msgbox(f"Borrower '{name}' added successfully.", "Success")
 
-def view_borrowers(cursor):
+def render_borrowers(cursor):
     cursor.execute("SELECT Borrower_ID, Borrower_Name, Email, Phone FROM Borrowers ORDER BY Borrower_Name COLLATE NOCASE")
     rows = cursor.fetchall()
     if not rows:
-        eg.msgbox("No borrowers found.", "Borrowers")
-        return
+        return None
     display = f"{'ID':<4}{'Borrower Name':<30}{'Email':<30}{'Phone':<15}\n" + "="*85 + "\n"
     for bid, n, e, p in rows:
         display += f"{(bid or ''):<4}{(n or ''):<30}{(e or ''):<30}{(p or ''):<15}\n"
+    return display
+
+def view_borrowers(cursor):
+    display = cached_render(cursor, "borrowers", None, render_borrowers)
+    if display is None:
+        eg.msgbox("No borrowers found.", "Borrowers")
+        return
     eg.codebox("Borrowers", "Borrower List", display)
 
 def add_book_location(conn, cursor):
@@ -274,14 +649,21 @@ def add_book_location(conn, cursor):
     if copies is None:
         return
 
-    cursor.execute("""
-        INSERT INTO Book_Locations (Book_ID, Location_Name, Copies)
-        VALUES (?, ?, ?)
-    """, (book_id, location, copies))
+    barcode = eg.enterbox("Enter copy barcode (optional):", "Barcode")
+    barcode = barcode.strip() if barcode else None
+
+    try:
+        cursor.execute("""
+            INSERT INTO Book_Locations (Book_ID, Location_Name, Copies, Barcode)
+            VALUES (?, ?, ?, ?)
+        """, (book_id, location, copies, barcode or None))
+    except sqlite3.IntegrityError:
+        eg.msgbox(f"Barcode '{barcode}' is already used by another copy.", "Duplicate Barcode")
+        return
     conn.commit()
     eg.msgbox(f"Book '{book_choice}' stored at '{location}' ({copies} copies).", "Success")
 
-def view_book_locations(cursor):
+def render_book_locations(cursor):
     cursor.execute("""
         SELECT L.Title, BL.Location_Name, BL.Copies
         FROM Book_Locations BL
@@ -290,13 +672,19 @@ def view_book_locations(cursor):
     """)
     rows = cursor.fetchall()
     if not rows:
-        eg.msgbox("No book locations found.", "Book Locations")
-        return
+        return None
 
     display = f"{'Book Title':<35}{'Location':<25}{'Copies':<7}\n" + "="*70 + "\n"
     for title, location, copies in rows:
         display += f"{(title or ''):<35}{(location or ''):<25}{(copies or 0):<7}\n"
 
+    return display
+
+def view_book_locations(cursor):
+    display = cached_render(cursor, "book_locations", None, render_book_locations)
+    if display is None:
+        eg.msgbox("No book locations found.", "Book Locations")
+        return
     eg.codebox("Book Locations", "Book Locations List", display)
 
 def add_loan(conn, cursor):
@@ -351,19 +739,37 @@ def add_loan(conn, cursor):
     else:
         return_date = None
 
+    due_date = due_date_for(loan_date)
     cursor.execute("""
-        INSERT INTO Loans (Book_ID, Borrower_ID, Loan_Date, Return_Date)
-        VALUES (?, ?, ?, ?)
-    """, (book_id, borrower_id, loan_date, return_date))
+        INSERT INTO Loans (Book_ID, Borrower_ID, Loan_Date, Return_Date, Due_Date)
+        VALUES (?, ?, ?, ?, ?)
+    """, (book_id, borrower_id, loan_date, return_date, due_date))
     conn.commit()
-    eg.msgbox(f"Loan recorded: '{book_choice}' to '{borrower_choice}'.", "Success")
 
-def view_loans(cursor):
+    msg = f"Loan recorded: '{book_choice}' to '{borrower_choice}' (due {due_date})."
+    suggestions = get_recommendations(cursor, book_id)
+    if suggestions:
+        msg += "\n\nBorrowers who took this also took:\n" + "\n".join(f"  - {t}" for t in suggestions)
+    eg.msgbox(msg, "Success")
+
+def get_recommendations(cursor, book_id):
+    """Titles recommended for a book, best first (one indexed read of Recommendations)."""
+    cursor.execute("""
+        SELECT L.Title
+        FROM Recommendations R
+        JOIN Library_database L ON L.Book_ID = R.Recommended_ID
+        WHERE R.Book_ID = ?
+        ORDER BY R.Rank
+    """, (book_id,))
+    return [r[0] for r in cursor.fetchall()]
+
+def render_loans(cursor):
     cursor.execute("""
         SELECT L.Loan_ID,
                B.Title,
                BR.Borrower_Name,
                L.Loan_Date,
+               L.Due_Date,
                L.Return_Date
         FROM Loans L
         LEFT JOIN Library_database B ON L.Book_ID = B.Book_ID
@@ -372,13 +778,92 @@ def view_loans(cursor):
     """)
     rows = cursor.fetchall()
     if not rows:
+        return None
+    display = f"{'Loan ID':<8}{'Book Title':<35}{'Borrower':<25}{'Loan Date':<12}{'Due Date':<12}{'Return Date':<12}\n" + "="*112 + "\n"
+    for lid, title, borrower, loan_d, due_d, return_d in rows:
+        display += f"{(lid or ''):<8}{(title or ''):<35}{(borrower or ''):<25}{(loan_d or ''):<12}{(due_d or ''):<12}{(return_d or ''):<12}\n"
+    return display
+
+def view_loans(cursor):
+    display = cached_render(cursor, "loans", None, render_loans)
+    if display is None:
         eg.msgbox("No loans found.", "Loans")
         return
-    display = f"{'Loan ID':<8}{'Book Title':<35}{'Borrower':<25}{'Loan Date':<12}{'Return Date':<12}\n" + "="*100 + "\n"
-    for lid, title, borrower, loan_d, return_d in rows:
-        display += f"{(lid or ''):<8}{(title or ''):<35}{(borrower or ''):<25}{(loan_d or ''):<12}{(return_d or ''):<12}\n"
     eg.codebox("Loans", "Loan List", display)
 
+# ==========================================================
+# Barcode Checkout
+# ==========================================================
+
+def find_book_by_code(cursor, code):
+    """Return the Book_ID for a scanned copy barcode or ISBN (None if unknown)."""
+    cursor.execute("SELECT Book_ID FROM Book_Locations WHERE Barcode = ?", (code,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("SELECT Book_ID FROM Library_database WHERE ISBN = ?", (code,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def record_scanned_loans(conn, cursor, borrower_id, loan_date, codes):
+    """
+    Record one loan per scanned code in a single transaction.
+    Returns (number of loans recorded, list of unknown codes).
+    Nothing is written if any code is unknown.
+    """
+    book_ids = []
+    unknown = []
+    for code in codes:
+        book_id = find_book_by_code(cursor, code)
+        if book_id is None:
+            unknown.append(code)
+        else:
+            book_ids.append(book_id)
+    if unknown:
+        return 0, unknown
+
+    with conn:
+        cursor.executemany("""
+            INSERT INTO Loans (Book_ID, Borrower_ID, Loan_Date, Return_Date, Due_Date)
+            VALUES (?, ?, ?, NULL, ?)
+        """, [(book_id, borrower_id, loan_date, due_date_for(loan_date)) for book_id in book_ids])
+    return len(book_ids), []
+
+def scan_checkout(conn, cursor):
+    cursor.execute("SELECT Borrower_ID, Borrower_Name FROM Borrowers ORDER BY Borrower_Name COLLATE NOCASE")
+    borrowers = cursor.fetchall()
+    if not borrowers:
+        eg.msgbox("No borrowers found. Add one first.", "Missing Data")
+        return
+
+    borrower_names = [b[1] for b in borrowers]
+    if len(borrower_names) == 1:
+        borrower_choice = borrower_names[0]
+        eg.msgbox(f"Only one borrower found — automatically selected:\n\n{borrower_choice}", "Info")
+    else:
+        borrower_choice = eg.choicebox("Select a borrower:", "Select Borrower", borrower_names)
+        if borrower_choice is None:
+            return
+    borrower_id = next(b[0] for b in borrowers if b[1] == borrower_choice)
+
+    loan_date = get_valid_date("Enter Loan Date")
+    if loan_date is None:
+        return
+
+    scanned = eg.textbox("Scan each barcode or ISBN (one per line):", "Scan Checkout", "")
+    if scanned is None:
+        return
+    codes = [line.strip() for line in scanned.splitlines() if line.strip()]
+    if not codes:
+        eg.msgbox("No barcodes were scanned.", "Scan Checkout")
+        return
+
+    count, unknown = record_scanned_loans(conn, cursor, borrower_id, loan_date, codes)
+    if unknown:
+        eg.msgbox("These codes were not found, so no loans were recorded:\n\n" + "\n".join(unknown),
+                  "Unknown Barcodes")
+        return
+    eg.msgbox(f"{count} loan(s) recorded for '{borrower_choice}'.", "Success")
+
 # ==========================================================
 # Main Menu
 # ==========================================================
@@ -388,15 +873,16 @@ def main():
 
     while True:
         choice = eg.buttonbox(
-            "Library Database System",
+            "Library Database System\n\n" + status_summary(cursor),
             "Main Menu",
             choices=[
                 "Add Author", "View Authors",
                 "Add Book", "View Books",
                 "Add Borrower", "View Borrowers",
                 "Add Book Location", "View Book Locations",
-                "Add Loan",
-                "View Loans", "Exit"
+                "Add Loan", "Scan Checkout",
+                "View Loans",
+                "View Statistics", "Reconcile Statistics", "Exit"
             ]
         )
 
@@ -418,8 +904,14 @@ def main():
             view_book_locations(cursor)
         elif choice == "Add Loan":
             add_loan(conn, cursor)
+        elif choice == "Scan Checkout":
+            scan_checkout(conn, cursor)
         elif choice == "View Loans":
             view_loans(cursor)
+        elif choice == "View Statistics":
+            view_statistics(cursor)
+        elif choice == "Reconcile Statistics":
+            reconcile_statistics(conn, cursor)
         else:
             conn.close()
             break
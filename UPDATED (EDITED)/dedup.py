@@ -0,0 +1,267 @@
+import sys
+import argparse
+import difflib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from Library_Database_Code import connect_db, name_tokens, title_key
+
+# ==========================================================
+# Duplicate detection for Authors and Library_database
+#
+# Comparing every author with every other author is O(n^2). Instead we put
+# names into "blocks" that share a cheap key (surname + first initial for
+# authors, author + first title word for books) and only compare names
+# inside the same block. Blocks can be spread over a process pool.
+#
+#   python dedup.py authors                 -> list proposed author merges
+#   python dedup.py books --workers 4       -> same for books, 4 processes
+#   python dedup.py authors --apply         -> carry out the merges
+# ==========================================================
+
+GIVEN_NAME_SIMILARITY = 0.85
+TITLE_SIMILARITY = 0.9
+NUMBER_WORDS = {"one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+                "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+                "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x"}
+MERGE_BATCH_SIZE = 500
+
+# ==========================================================
+# Clustering inside one block
+# ==========================================================
+
+def union_clusters(ids, pairs):
+    """Join matching pairs into clusters (union-find). Returns lists of 2+ IDs."""
+    parent = {i: i for i in ids}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+
+    groups = {}
+    for i in ids:
+        groups.setdefault(find(i), []).append(i)
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+def split_author(name):
+    """Return (given names, initials, True if the given names are only initials)."""
+    tokens = name_tokens(name)
+    given = tokens[:-1]
+    initials = "".join(t[0] for t in given)
+    return " ".join(given), initials, all(len(t) == 1 for t in given)
+
+def given_names_match(a, b):
+    """
+    Compare two split_author() results. Full given names match when they are
+    (nearly) the same spelling, initials-only names match full names whose
+    initials fit, and two initials-only names must have the same initials.
+    """
+    if a[3] and b[3]:
+        return a[2] == b[2]
+    if a[3] or b[3]:
+        return a[2].startswith(b[2]) or b[2].startswith(a[2])
+    return a[1] == b[1] or difflib.SequenceMatcher(None, a[1], b[1]).ratio() >= GIVEN_NAME_SIMILARITY
+
+def cluster_author_block(block):
+    """
+    Find duplicate authors inside one block of (Author_ID, Author_Name) rows.
+    Everyone in a block already shares a surname and first initial.
+    Returns (clusters to merge, clusters to check by hand); every author in a
+    merge cluster matches every other one, so "Jon" can't chain "John" to "Joan".
+    """
+    parsed = [(aid,) + split_author(name) for aid, name in block]
+    full = [p for p in parsed if not p[3]]
+    short = [p for p in parsed if p[3]]
+
+    def fits(member, group):
+        return all(given_names_match(member, other) for other in group)
+
+    # Full names: join the closest pairs first, and only while the whole group still matches.
+    group_of = {p[0]: [p] for p in full}
+    scored = sorted((-difflib.SequenceMatcher(None, a[1], b[1]).ratio(), a[0], b[0])
+                    for a, b in itertools.combinations(full, 2) if given_names_match(a, b))
+    for _score, a_id, b_id in scored:
+        group_a, group_b = group_of[a_id], group_of[b_id]
+        if group_a is not group_b and all(fits(member, group_a) for member in group_b):
+            group_a.extend(group_b)
+            for member in group_b:
+                group_of[member[0]] = group_a
+    groups = list({id(g): g for g in group_of.values()}.values())
+
+    # Initials-only names ("J. K.") join a group only when exactly one fits,
+    # so "J Smith" can't glue John and Joan together.
+    leftover = {}
+    candidates = {}
+    for s in short:
+        fitting = [g for g in groups if fits(s, g)]
+        if len(fitting) == 1:
+            fitting[0].append(s)
+        else:
+            leftover.setdefault(s[2], []).append(s)
+            for g in fitting:
+                candidates.setdefault(s[2], {})[id(g)] = g
+
+    # The rest are still grouped with each other by their initials. When they
+    # fit several groups, they are listed with those groups to check by hand.
+    similar = []
+    for initials, members in leftover.items():
+        groups.append(members)
+        if initials in candidates:
+            similar.append(sorted([p[0] for p in members]
+                                  + [p[0] for g in candidates[initials].values() for p in g]))
+
+    return [sorted(p[0] for p in g) for g in groups if len(g) > 1], similar
+
+def number_tokens(key):
+    """The numbers and ordinal words in a title key ("harry potter 2" -> ("2",))."""
+    return tuple(w for w in key.split() if w.isdigit() or w in NUMBER_WORDS or w[:-2].isdigit())
+
+def cluster_book_block(block):
+    """
+    Find duplicate books inside one block of (Book_ID, Title) rows by the same author.
+    Returns (clusters to merge, clusters to check by hand). Only titles with the
+    same title_key are merged. Titles that are merely similar ("The Colour of
+    Magic" / "Colour of Magick") are returned for checking, and only when their
+    numbers match, so "Book 2" and "Book 3" never end up together. Titles whose
+    first word differs ("Colour" / "Color") are in different blocks and aren't compared.
+    """
+    keys = [(bid, title_key(title)) for bid, title in block]
+    ids = [k[0] for k in keys]
+    same = []
+    similar = []
+    for a, b in itertools.combinations(keys, 2):
+        if a[1] == b[1]:
+            same.append((a[0], b[0]))
+        elif (number_tokens(a[1]) == number_tokens(b[1])
+              and difflib.SequenceMatcher(None, a[1], b[1]).ratio() >= TITLE_SIMILARITY):
+            similar.append((a[0], b[0]))
+    return union_clusters(ids, same), union_clusters(ids, similar)
+
+# ==========================================================
+# Blocking and running the comparisons
+# ==========================================================
+
+def author_blocks(cursor):
+    """Stream Authors in Name_Key order (via its index) and yield blocks of 2+ rows."""
+    cursor.execute("SELECT Name_Key, Author_ID, Author_Name FROM Authors WHERE Name_Key IS NOT NULL ORDER BY Name_Key")
+    for _key, rows in itertools.groupby(cursor, key=lambda r: r[0]):
+        block = [(aid, name) for _k, aid, name in rows]
+        if len(block) > 1:
+            yield block
+
+def book_blocks(cursor):
+    """Group books by author and first title word, and yield blocks of 2+ rows."""
+    cursor.execute("SELECT Book_ID, Title, Author_ID FROM Library_database")
+    blocks = {}
+    for bid, title, author_id in cursor:
+        words = title_key(title).split()
+        blocks.setdefault((author_id, words[0] if words else ""), []).append((bid, title))
+    return [b for b in blocks.values() if len(b) > 1]
+
+def find_clusters(blocks, compare, workers=1):
+    """
+    Run the block comparison function over every block, optionally in a process pool.
+    Returns (clusters to merge, clusters to check by hand) for all blocks together.
+    """
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(compare, blocks, chunksize=64))
+    else:
+        results = [compare(block) for block in blocks]
+    merges = [cluster for clusters, _similar in results for cluster in clusters]
+    similar = [cluster for _clusters, clusters in results for cluster in clusters]
+    return merges, similar
+
+# ==========================================================
+# Applying merges
+# ==========================================================
+
+def merge_clusters(conn, clusters, delete_query, repoint_queries, batch_size=MERGE_BATCH_SIZE):
+    """
+    Merge each cluster into its lowest ID: run every repoint query with
+    (kept ID, duplicate ID), then the delete query for each duplicate.
+    Work is committed in batches so a big merge doesn't hold one huge transaction.
+    Returns the number of rows removed.
+    """
+    moves = [(keep, dup) for cluster in clusters for keep in [min(cluster)] for dup in cluster if dup != keep]
+
+    for start in range(0, len(moves), batch_size):
+        batch = moves[start:start + batch_size]
+        with conn:
+            for query in repoint_queries:
+                conn.executemany(query, batch)
+            conn.executemany(delete_query, [(dup,) for _keep, dup in batch])
+    return len(moves)
+
+def merge_authors(conn, clusters):
+    return merge_clusters(conn, clusters, "DELETE FROM Authors WHERE Author_ID = ?",
+                          ["UPDATE Library_database SET Author_ID = ? WHERE Author_ID = ?"])
+
+def merge_books(conn, clusters):
+    # Keep an ISBN from a removed duplicate if the kept book has none.
+    isbns = []
+    for cluster in clusters:
+        for dup in cluster[1:]:
+            row = conn.execute("SELECT ISBN FROM Library_database WHERE Book_ID = ?", (dup,)).fetchone()
+            if row and row[0]:
+                isbns.append((row[0], cluster[0]))
+    removed = merge_clusters(conn, clusters, "DELETE FROM Library_database WHERE Book_ID = ?",
+                             ["UPDATE Loans SET Book_ID = ? WHERE Book_ID = ?",
+                              "UPDATE Book_Locations SET Book_ID = ? WHERE Book_ID = ?"])
+    with conn:
+        conn.executemany("UPDATE Library_database SET ISBN = ? WHERE Book_ID = ? AND ISBN IS NULL", isbns)
+    return removed
+
+# ==========================================================
+# Command line
+# ==========================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge duplicate authors or books.")
+    parser.add_argument("kind", choices=["authors", "books"])
+    parser.add_argument("--workers", type=int, default=1, help="processes used to compare blocks")
+    parser.add_argument("--apply", action="store_true", help="merge the clusters that were found")
+    parser.add_argument("--db", default="library_database.db")
+    args = parser.parse_args()
+
+    conn, cursor = connect_db(args.db)
+
+    if args.kind == "authors":
+        clusters, similar = find_clusters(list(author_blocks(cursor)), cluster_author_block, args.workers)
+        names = dict(conn.execute("SELECT Author_ID, Author_Name FROM Authors"))
+    else:
+        clusters, similar = find_clusters(book_blocks(cursor), cluster_book_block, args.workers)
+        names = dict(conn.execute("SELECT Book_ID, Title FROM Library_database"))
+
+    if not clusters and not similar:
+        print(f"No duplicate {args.kind} found.")
+        conn.close()
+        return 0
+
+    if clusters:
+        print(f"Proposed merges ({len(clusters)} clusters, first ID is kept):\n")
+        for cluster in clusters:
+            print("  " + "  <=  ".join(f"[{i}] {names[i]}" for i in cluster))
+
+    if similar:
+        print(f"\nPossible duplicates to check by hand ({len(similar)} clusters, never merged by --apply):\n")
+        for cluster in similar:
+            print("  " + "  ~  ".join(f"[{i}] {names[i]}" for i in cluster))
+
+    if args.apply and clusters:
+        merge = merge_authors if args.kind == "authors" else merge_books
+        removed = merge(conn, clusters)
+        print(f"\nMerged {removed} duplicate {args.kind}.")
+    elif clusters:
+        print("\nRun again with --apply to merge them.")
+
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import sys
+import argparse
+
+from Library_Database_Code import connect_db, get_watermark, set_watermark
+
+# ==========================================================
+# Integrity and consistency checker
+#
+# Finds orphaned rows (loans, locations and books pointing at something
+# that no longer exists), negative copy counts, loans returned before they
+# were issued and malformed dates. Orphans are found with anti-joins that
+# probe the parent's primary key, so each check is one pass over the rows
+# being checked.
+#
+# --incremental only checks:
+#   - rows added since the last run (rowid above the saved watermark)
+#   - rows logged in Integrity_Changes by the update/delete triggers,
+#     plus the children of any logged parent (found through the FK indexes)
+#   - rows that still had a problem last time (they stay in Integrity_Changes)
+#
+#   python integrity_check.py                  -> check everything
+#   python integrity_check.py --incremental    -> nightly check of recent changes
+# ==========================================================
+
+WATERMARK_PREFIX = "integrity:"
+SHOW_IDS = 20
+
+# (problem, table, query for the bad rows with lo < primary key <= hi).
+# Every query is written out in full so check_query_plans.py can check its plan.
+# The same query serves all three modes: new rows (watermark, max], one changed
+# row (id - 1, id) and everything (0, max), so each is a primary key range.
+# A NULL reference is not an orphan: foreign keys allow it, as the schema does.
+# Dates are valid when date(col, '+0 days') gives the stored text back: SQLite
+# rolls impossible days over (2025-02-30 -> 2025-03-02), so those don't match.
+CHECKS = [
+    ("Loans with a missing book", "Loans", """
+        SELECT X.Loan_ID FROM Loans X
+        WHERE X.Loan_ID > ? AND X.Loan_ID <= ?
+          AND X.Book_ID IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM Library_database P WHERE P.Book_ID = X.Book_ID)
+    """),
+    ("Loans with a missing borrower", "Loans", """
+        SELECT X.Loan_ID FROM Loans X
+        WHERE X.Loan_ID > ? AND X.Loan_ID <= ?
+          AND X.Borrower_ID IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM Borrowers P WHERE P.Borrower_ID = X.Borrower_ID)
+    """),
+    ("Loans returned before they were issued", "Loans", """
+        SELECT X.Loan_ID FROM Loans X
+        WHERE X.Loan_ID > ? AND X.Loan_ID <= ? AND X.Return_Date < X.Loan_Date
+    """),
+    ("Loans with malformed dates", "Loans", """
+        SELECT X.Loan_ID FROM Loans X
+        WHERE X.Loan_ID > ? AND X.Loan_ID <= ?
+          AND NOT ((X.Loan_Date IS NULL OR date(X.Loan_Date, '+0 days') IS X.Loan_Date)
+               AND (X.Return_Date IS NULL OR date(X.Return_Date, '+0 days') IS X.Return_Date)
+               AND (X.Due_Date IS NULL OR date(X.Due_Date, '+0 days') IS X.Due_Date))
+    """),
+    ("Book locations with a missing book", "Book_Locations", """
+        SELECT X.Location_ID FROM Book_Locations X
+        WHERE X.Location_ID > ? AND X.Location_ID <= ?
+          AND X.Book_ID IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM Library_database P WHERE P.Book_ID = X.Book_ID)
+    """),
+    ("Book locations with negative copies", "Book_Locations", """
+        SELECT X.Location_ID FROM Book_Locations X
+        WHERE X.Location_ID > ? AND X.Location_ID <= ? AND X.Copies < 0
+    """),
+    ("Books with a missing author", "Library_database", """
+        SELECT X.Book_ID FROM Library_database X
+        WHERE X.Book_ID > ? AND X.Book_ID <= ?
+          AND X.Author_ID IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM Authors P WHERE P.Author_ID = X.Author_ID)
+    """),
+    ("Books with a malformed publish date", "Library_database", """
+        SELECT X.Book_ID FROM Library_database X
+        WHERE X.Book_ID > ? AND X.Book_ID <= ?
+          AND NOT (X.Date_Published IS NULL OR date(X.Date_Published, '+0 days') IS X.Date_Published)
+    """),
+]
+
+# checked table -> query for its highest primary key
+CHECKED_TABLES = {
+    "Loans": "SELECT MAX(Loan_ID) FROM Loans",
+    "Book_Locations": "SELECT MAX(Location_ID) FROM Book_Locations",
+    "Library_database": "SELECT MAX(Book_ID) FROM Library_database",
+}
+
+# parent table -> (child table, query for the children of one parent row)
+CHILDREN = {
+    "Library_database": [("Loans", "SELECT Loan_ID FROM Loans WHERE Book_ID = ?"),
+                         ("Book_Locations", "SELECT Location_ID FROM Book_Locations WHERE Book_ID = ?")],
+    "Borrowers": [("Loans", "SELECT Loan_ID FROM Loans WHERE Borrower_ID = ?")],
+    "Authors": [("Library_database", "SELECT Book_ID FROM Library_database WHERE Author_ID = ?")],
+}
+
+# ==========================================================
+# The change log
+# ==========================================================
+
+def changed_rows(cursor, changes):
+    """
+    Turn the logged changes into {table: set of row IDs to re-check}: the logged
+    row itself, and every child row that points at it.
+    """
+    rows = {table: set() for table in CHECKED_TABLES}
+    for table, row_id in changes:
+        if table in rows:
+            rows[table].add(row_id)
+        for child, query in CHILDREN.get(table, []):
+            cursor.execute(query, (row_id,))
+            rows[child].update(r[0] for r in cursor.fetchall())
+    return rows
+
+# ==========================================================
+# Running the checks
+# ==========================================================
+
+def run_checks(conn, cursor, incremental=False):
+    """
+    Run every check and return {problem: [row IDs]} for the problems found.
+    Afterwards the watermarks are moved up and the processed change log is
+    cleared, except for the rows that still have a problem: those are put back
+    in Integrity_Changes so every incremental run reports them until they are fixed.
+    """
+    # Snapshot where we are up to, so rows added during the run are checked next time.
+    new_marks = {}
+    for table, query in CHECKED_TABLES.items():
+        cursor.execute(query)
+        new_marks[table] = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT Table_Name, Row_ID FROM Integrity_Changes")
+    changes = cursor.fetchall()
+
+    if incremental:
+        old_marks = {table: get_watermark(cursor, WATERMARK_PREFIX + table) for table in CHECKED_TABLES}
+        recheck = changed_rows(cursor, changes)
+
+    problems = {}
+    unresolved = set()
+    for problem, table, query in CHECKS:
+        if incremental:
+            # New rows: a rowid range, so only the rows after the watermark are read.
+            cursor.execute(query, (old_marks[table], new_marks[table]))
+            bad = {r[0] for r in cursor.fetchall()}
+            # Changed rows: one primary key probe each.
+            for row_id in recheck[table]:
+                cursor.execute(query, (row_id - 1, row_id))
+                bad.update(r[0] for r in cursor.fetchall())
+        else:
+            cursor.execute(query, (0, new_marks[table]))
+            bad = {r[0] for r in cursor.fetchall()}
+        if bad:
+            problems[problem] = sorted(bad)
+            unresolved.update((table, row_id) for row_id in bad)
+
+    with conn:
+        cursor.executemany("DELETE FROM Integrity_Changes WHERE Table_Name = ? AND Row_ID = ?", changes)
+        cursor.executemany("INSERT OR IGNORE INTO Integrity_Changes (Table_Name, Row_ID) VALUES (?, ?)",
+                           sorted(unresolved))
+        for table, last_id in new_marks.items():
+            set_watermark(cursor, WATERMARK_PREFIX + table, last_id)
+    return problems
+
+def format_report(problems):
+    if not problems:
+        return "No problems found."
+    lines = []
+    for problem, ids in problems.items():
+        shown = ", ".join(str(i) for i in ids[:SHOW_IDS])
+        more = f" (+{len(ids) - SHOW_IDS} more)" if len(ids) > SHOW_IDS else ""
+        lines.append(f"{problem}: {len(ids)}\n    IDs: {shown}{more}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the library database for orphaned and inconsistent rows.")
+    parser.add_argument("--incremental", action="store_true", help="only check rows changed since the last run")
+    parser.add_argument("--db", default="library_database.db")
+    args = parser.parse_args()
+
+    conn, cursor = connect_db(args.db)
+    problems = run_checks(conn, cursor, args.incremental)
+    conn.close()
+
+    print(format_report(problems))
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
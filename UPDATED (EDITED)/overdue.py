@@ -0,0 +1,217 @@
+import sys
+import json
+import heapq
+import time
+import argparse
+import datetime
+import smtplib
+from email.message import EmailMessage
+
+from Library_Database_Code import connect_db
+
+# ==========================================================
+# Overdue loans and reminders
+#
+# Open loans are read in due-date order straight from the partial index
+# idx_loans_open_due (returned loans are not in it), a page at a time,
+# into an in-memory heap. Each run only pops the loans that are due (or
+# due within the reminder window), groups them per borrower and hands one
+# batch per borrower to a "sink": print, a JSON-lines file, or an SMTP server.
+# Open loans without a Due_Date (their Loan_Date couldn't be read) can't be
+# scheduled, so each run prints a warning with how many there are.
+#
+#   python overdue.py                               -> print today's batches
+#   python overdue.py --sink file --out notices.txt
+#   python overdue.py --sink smtp --smtp-port 1025  -> e.g. a local stub SMTP server
+#   python overdue.py --watch                       -> keep running, check every hour, process each new day once
+# ==========================================================
+
+REMINDER_DAYS = 2
+PAGE_SIZE = 500
+
+# ==========================================================
+# Sinks (where the batches go)
+# ==========================================================
+
+def format_batch(batch):
+    lines = [f"To: {batch['name']} <{batch['email'] or 'no email'}> {batch['phone'] or ''}".rstrip()]
+    for title, due in batch["overdue"]:
+        lines.append(f"  OVERDUE   {title} (was due {due})")
+    for title, due in batch["reminders"]:
+        lines.append(f"  DUE SOON  {title} (due {due})")
+    return "\n".join(lines)
+
+def print_sink(batch):
+    print(format_batch(batch) + "\n")
+
+def file_sink(path):
+    """Append each batch to a file (one JSON object per line)."""
+    def send(batch):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(batch) + "\n")
+    return send
+
+def smtp_sink(host="localhost", port=1025, sender="library@localhost"):
+    """Email each borrower who has an address. Borrowers without one are printed instead."""
+    def send(batch):
+        if not batch["email"]:
+            print_sink(batch)
+            return
+        msg = EmailMessage()
+        msg["From"] = sender
+        msg["To"] = batch["email"]
+        msg["Subject"] = "Library loans overdue" if batch["overdue"] else "Library loans due soon"
+        msg.set_content(format_batch(batch))
+        with smtplib.SMTP(host, port) as server:
+            server.send_message(msg)
+    return send
+
+# ==========================================================
+# Scheduler
+# ==========================================================
+
+class OverdueScheduler:
+    """Heap of the next open loans by due date, refilled from the partial index."""
+
+    def __init__(self, cursor, page_size=PAGE_SIZE):
+        self.cursor = cursor
+        self.page_size = page_size
+        self.heap = []
+        self.last_key = ("", 0)    # (Due_Date, Loan_ID) of the last loan loaded
+        self.exhausted = False
+
+    def refill(self):
+        """Load the next page of open loans after last_key (index order, no sorting)."""
+        self.cursor.execute("""
+            SELECT Due_Date, Loan_ID FROM Loans
+            WHERE Return_Date IS NULL AND (Due_Date, Loan_ID) > (?, ?)
+            ORDER BY Due_Date, Loan_ID
+            LIMIT ?
+        """, self.last_key + (self.page_size,))
+        rows = self.cursor.fetchall()
+        for row in rows:
+            heapq.heappush(self.heap, row)
+        if rows:
+            self.last_key = rows[-1]
+        self.exhausted = len(rows) < self.page_size
+
+    def restart(self):
+        """Start again from the earliest due loan (used at the start of each day)."""
+        self.heap = []
+        self.last_key = ("", 0)
+        self.exhausted = False
+        self.refill()
+
+    def next_due(self):
+        """Due date of the next loan in the heap, or None if there are no open loans."""
+        if not self.heap and not self.exhausted:
+            self.refill()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, until):
+        """Pop every loan due on or before `until` (YYYY-MM-DD) and return their IDs."""
+        due = []
+        while True:
+            if not self.heap:
+                if self.exhausted:
+                    break
+                self.refill()
+                continue
+            if self.heap[0][0] > until:
+                break
+            due.append(heapq.heappop(self.heap)[1])
+        return due
+
+def loan_details(cursor, loan_ids):
+    """Look up title and borrower contact details for loans that are still open."""
+    details = []
+    for loan_id in loan_ids:
+        cursor.execute("""
+            SELECT L.Due_Date, B.Title, BR.Borrower_ID, BR.Borrower_Name, BR.Email, BR.Phone
+            FROM Loans L
+            LEFT JOIN Library_database B ON L.Book_ID = B.Book_ID
+            LEFT JOIN Borrowers BR ON L.Borrower_ID = BR.Borrower_ID
+            WHERE L.Loan_ID = ? AND L.Return_Date IS NULL
+        """, (loan_id,))
+        row = cursor.fetchone()
+        if row:
+            details.append(row)
+    return details
+
+def count_undated(cursor):
+    """Open loans with no Due_Date, which the scheduler never sees."""
+    cursor.execute("SELECT COUNT(*) FROM Loans WHERE Return_Date IS NULL AND Due_Date IS NULL")
+    return cursor.fetchone()[0]
+
+def build_batches(details, today):
+    """Group loan details into one batch per borrower, split into overdue and due soon."""
+    batches = {}
+    for due, title, borrower_id, name, email, phone in details:
+        batch = batches.setdefault(borrower_id, {
+            "borrower_id": borrower_id, "name": name or "", "email": email, "phone": phone,
+            "overdue": [], "reminders": [],
+        })
+        batch["overdue" if due < today else "reminders"].append((title or "", due))
+    return list(batches.values())
+
+def process_due(scheduler, today, sink, reminder_days=REMINDER_DAYS):
+    """
+    Send today's overdue notices and reminders. Only loans due by today plus the
+    reminder window are read. Returns the number of borrower batches sent.
+    """
+    until = (datetime.datetime.strptime(today, "%Y-%m-%d")
+             + datetime.timedelta(days=reminder_days)).strftime("%Y-%m-%d")
+    undated = count_undated(scheduler.cursor)
+    if undated:
+        print(f"Warning: {undated} open loan(s) have no due date (check their Loan_Date) and were skipped.")
+    scheduler.restart()
+    loan_ids = scheduler.pop_due(until)
+    batches = build_batches(loan_details(scheduler.cursor, loan_ids), today)
+    for batch in batches:
+        sink(batch)
+    return len(batches)
+
+def watch(scheduler, sink, reminder_days=REMINDER_DAYS, poll_seconds=3600):
+    """Run once a day, and sleep in between (checking at least every poll_seconds)."""
+    last_run = None
+    while True:
+        today = datetime.date.today().isoformat()
+        if today != last_run:
+            count = process_due(scheduler, today, sink, reminder_days)
+            print(f"{today}: sent {count} batch(es). Next loan due: {scheduler.next_due() or 'none'}")
+            last_run = today
+        time.sleep(poll_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Send overdue notices and due-soon reminders.")
+    parser.add_argument("--today", default=datetime.date.today().isoformat(), help="date to process (YYYY-MM-DD)")
+    parser.add_argument("--reminder-days", type=int, default=REMINDER_DAYS)
+    parser.add_argument("--sink", choices=["print", "file", "smtp"], default="print")
+    parser.add_argument("--out", default="reminders.jsonl", help="output file for --sink file")
+    parser.add_argument("--smtp-host", default="localhost")
+    parser.add_argument("--smtp-port", type=int, default=1025)
+    parser.add_argument("--watch", action="store_true", help="keep running and process each new day")
+    parser.add_argument("--db", default="library_database.db")
+    args = parser.parse_args()
+
+    if args.sink == "file":
+        sink = file_sink(args.out)
+    elif args.sink == "smtp":
+        sink = smtp_sink(args.smtp_host, args.smtp_port)
+    else:
+        sink = print_sink
+
+    conn, cursor = connect_db(args.db)
+    scheduler = OverdueScheduler(cursor)
+    try:
+        if args.watch:
+            watch(scheduler, sink, args.reminder_days)
+        else:
+            count = process_due(scheduler, args.today, sink, args.reminder_days)
+            print(f"Sent {count} batch(es).")
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import os
+import sys
+import csv
+import shutil
+import sqlite3
+import argparse
+import datetime
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Library_Database_Code import connect_db
+
+# ==========================================================
+# Parallel scans for big read jobs
+#
+# A table is split into rowid ranges and each range is scanned by a worker
+# process on its own read-only connection. Workers send back small partial
+# results (counts, or the path of a CSV chunk they wrote), which are merged
+# in range order. connect_db() puts the database in WAL mode, so these
+# readers don't block the desk program while it records loans.
+#
+#   python parallel_scan.py export --out catalogue.csv --workers 4
+#   python parallel_scan.py genre-report
+#   python parallel_scan.py loan-summary
+# ==========================================================
+
+RANGES_PER_WORKER = 4   # more ranges than workers evens out gaps in the rowids
+
+def open_read_only(db_path):
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+def rowid_ranges(cursor, bounds_query, parts):
+    """Split a table's rowids into up to `parts` (lo, hi) ranges (MIN/MAX are index lookups)."""
+    cursor.execute(bounds_query)
+    lo, hi = cursor.fetchone()
+    if lo is None:
+        return []
+    size = max(1, (hi - lo + 1 + parts - 1) // parts)
+    return [(start, min(start + size - 1, hi)) for start in range(lo, hi + 1, size)]
+
+# ==========================================================
+# Jobs: one function to scan a range, one to merge the results
+# ==========================================================
+
+def export_scan(conn, lo, hi, work_dir):
+    """Write this range of the catalogue to its own CSV chunk, row by row."""
+    path = os.path.join(work_dir, f"chunk_{lo}.csv")
+    cursor = conn.execute("""
+        SELECT L.Book_ID, L.Title, A.Author_Name, L.Genre, L.Date_Published, L.Pages, L.ISBN
+        FROM Library_database L
+        LEFT JOIN Authors A ON L.Author_ID = A.Author_ID
+        WHERE L.Book_ID BETWEEN ? AND ?
+    """, (lo, hi))
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    return path, count
+
+def export_merge(results, out_path):
+    """Join the chunks in range order (rowid order) into the output file."""
+    total = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        csv.writer(out).writerow(["Book_ID", "Title", "Author", "Genre", "Date_Published", "Pages", "ISBN"])
+        for path, count in results:
+            with open(path, newline="", encoding="utf-8") as chunk:
+                shutil.copyfileobj(chunk, out)
+            os.remove(path)
+            total += count
+    return f"Exported {total} books to {out_path}."
+
+def genre_scan(conn, lo, hi, _work_dir):
+    """Books and total pages per genre for this range."""
+    books, pages = Counter(), Counter()
+    for genre, count, page_total in conn.execute("""
+        SELECT COALESCE(Genre, ''), COUNT(*), SUM(COALESCE(Pages, 0))
+        FROM Library_database
+        WHERE Book_ID BETWEEN ? AND ?
+        GROUP BY COALESCE(Genre, '')
+    """, (lo, hi)):
+        books[genre] += count
+        pages[genre] += page_total
+    return books, pages
+
+def genre_merge(results, _out_path):
+    books, pages = Counter(), Counter()
+    for part_books, part_pages in results:
+        books.update(part_books)
+        pages.update(part_pages)
+    report = f"{'Genre':<30}{'Books':<10}{'Avg Pages':<10}\n" + "=" * 50 + "\n"
+    for genre, count in books.most_common():
+        report += f"{(genre or '(none)'):<30}{count:<10}{pages[genre] // count:<10}\n"
+    return report
+
+def loan_summary_scan(conn, lo, hi, _work_dir):
+    """Counts of open, overdue and orphaned loans for this range (a NULL reference isn't an orphan)."""
+    today = datetime.date.today().isoformat()
+    counts = Counter()
+    for return_date, due_date, book_found, borrower_found in conn.execute("""
+        SELECT L.Return_Date, L.Due_Date,
+               L.Book_ID IS NULL OR B.Book_ID IS NOT NULL,
+               L.Borrower_ID IS NULL OR BR.Borrower_ID IS NOT NULL
+        FROM Loans L
+        LEFT JOIN Library_database B ON L.Book_ID = B.Book_ID
+        LEFT JOIN Borrowers BR ON L.Borrower_ID = BR.Borrower_ID
+        WHERE L.Loan_ID BETWEEN ? AND ?
+    """, (lo, hi)):
+        counts["loans"] += 1
+        if return_date is None:
+            counts["open"] += 1
+            if due_date and due_date < today:
+                counts["overdue"] += 1
+        if not book_found:
+            counts["missing book"] += 1
+        if not borrower_found:
+            counts["missing borrower"] += 1
+    return counts
+
+def loan_summary_merge(results, _out_path):
+    counts = Counter()
+    for part in results:
+        counts.update(part)
+    return "\n".join(f"{name:<20}{counts[name]}" for name in
+                     ["loans", "open", "overdue", "missing book", "missing borrower"])
+
+# job name -> (query for the rowid range of the table to split, scan function, merge function)
+# MIN and MAX go in separate subqueries: asking for both in one SELECT scans the whole table.
+BOOK_ROWIDS = "SELECT (SELECT MIN(rowid) FROM Library_database), (SELECT MAX(rowid) FROM Library_database)"
+LOAN_ROWIDS = "SELECT (SELECT MIN(rowid) FROM Loans), (SELECT MAX(rowid) FROM Loans)"
+JOBS = {
+    "export": (BOOK_ROWIDS, export_scan, export_merge),
+    "genre-report": (BOOK_ROWIDS, genre_scan, genre_merge),
+    "loan-summary": (LOAN_ROWIDS, loan_summary_scan, loan_summary_merge),
+}
+
+# ==========================================================
+# Executor
+# ==========================================================
+
+def scan_range(task):
+    """Worker entry point: run one job over one rowid range on a read-only connection."""
+    job, db_path, lo, hi, work_dir = task
+    conn = open_read_only(db_path)
+    try:
+        return JOBS[job][1](conn, lo, hi, work_dir)
+    finally:
+        conn.close()
+
+def run_job(db_path, job, workers=None, out_path=None):
+    """Split the job's table into ranges, scan them in a process pool and merge the results."""
+    workers = workers or os.cpu_count() or 1
+    bounds_query, _scan, merge = JOBS[job]
+
+    conn, cursor = connect_db(db_path)
+    ranges = rowid_ranges(cursor, bounds_query, workers * RANGES_PER_WORKER)
+    conn.close()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        tasks = [(job, db_path, lo, hi, work_dir) for lo, hi in ranges]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() hands results back in range order as they finish, so the
+            # merge can stream through them without holding everything at once.
+            return merge(pool.map(scan_range, tasks), out_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a large read job over the database in parallel.")
+    parser.add_argument("job", choices=sorted(JOBS))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--out", default="catalogue.csv", help="output file for export")
+    parser.add_argument("--db", default="library_database.db")
+    args = parser.parse_args()
+
+    print(run_job(args.db, args.job, args.workers, args.out))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
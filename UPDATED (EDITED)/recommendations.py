@@ -0,0 +1,142 @@
+import sys
+import argparse
+import itertools
+from collections import Counter
+
+from Library_Database_Code import connect_db, get_watermark, set_watermark
+
+# ==========================================================
+# Co-borrowing recommendations (batch job)
+#
+# Builds "borrowers who took this also took..." lists without a self-join
+# over Loans at checkout time. The job walks Loans one borrower at a time,
+# counts how many borrowers took each pair of books (a sparse book-by-book
+# matrix stored in Co_Borrowing), and keeps only the top K neighbours of
+# each book in Recommendations.
+#
+# Runs are incremental: only loans after the saved Loan_ID watermark are
+# processed, and only the books they touch are re-ranked. Loans are taken
+# in Loan_ID windows, and each window's counts, rankings and watermark are
+# committed together, so a run that is interrupted never counts a loan twice.
+#
+#   python recommendations.py            -> process new loans
+#   python recommendations.py --full     -> rebuild everything from scratch
+# ==========================================================
+
+JOB_NAME = "recommendations"
+TOP_K = 10
+FLUSH_PAIRS = 50000   # write the pair counts to the database once this many are held in memory
+WINDOW_LOANS = 20000  # loans processed (and committed) per window
+RANK_BATCH_SIZE = 500
+
+def borrower_pair_counts(old_books, new_books):
+    """
+    Pairs a borrower adds to the matrix: each newly borrowed book with every
+    other book they have taken. Both directions are counted so each book's
+    neighbours can be read with one index range.
+    """
+    pairs = Counter()
+    for a in new_books:
+        for b in old_books:
+            pairs[(a, b)] += 1
+            pairs[(b, a)] += 1
+    for a, b in itertools.permutations(new_books, 2):
+        pairs[(a, b)] += 1
+    return pairs
+
+def flush_pairs(cursor, pairs):
+    cursor.executemany("""
+        INSERT INTO Co_Borrowing (Book_A, Book_B, Borrowers) VALUES (?, ?, ?)
+        ON CONFLICT (Book_A, Book_B) DO UPDATE SET Borrowers = Borrowers + excluded.Borrowers
+    """, [(a, b, n) for (a, b), n in pairs.items()])
+
+def update_pairs(cursor, watermark, last_id):
+    """
+    Add the loans with watermark < Loan_ID <= last_id to Co_Borrowing (not committed).
+    Returns the set of books whose neighbours changed.
+    """
+    cursor.execute("SELECT DISTINCT Borrower_ID FROM Loans WHERE Loan_ID > ? AND Loan_ID <= ?", (watermark, last_id))
+    borrowers = [r[0] for r in cursor.fetchall()]
+
+    changed = set()
+    pairs = Counter()
+    for borrower_id in borrowers:
+        cursor.execute("SELECT Book_ID, Loan_ID FROM Loans WHERE Borrower_ID = ? AND Loan_ID <= ?", (borrower_id, last_id))
+        old_books, new_books = set(), set()
+        for book_id, loan_id in cursor.fetchall():
+            (old_books if loan_id <= watermark else new_books).add(book_id)
+        # Borrowing the same book again doesn't make a new pair.
+        new_books -= old_books
+        if not new_books or len(old_books) + len(new_books) < 2:
+            continue
+
+        pairs.update(borrower_pair_counts(old_books, new_books))
+        changed |= old_books | new_books
+        if len(pairs) >= FLUSH_PAIRS:
+            flush_pairs(cursor, pairs)
+            pairs.clear()
+
+    if pairs:
+        flush_pairs(cursor, pairs)
+    return changed
+
+def rank_books(cursor, book_ids, top_k):
+    """Rewrite the Recommendations rows for the given books from Co_Borrowing (not committed)."""
+    book_ids = sorted(book_ids)
+    for start in range(0, len(book_ids), RANK_BATCH_SIZE):
+        batch = book_ids[start:start + RANK_BATCH_SIZE]
+        rows = []
+        for book_id in batch:
+            cursor.execute("""
+                SELECT Book_B, Borrowers FROM Co_Borrowing
+                WHERE Book_A = ?
+                ORDER BY Borrowers DESC, Book_B
+                LIMIT ?
+            """, (book_id, top_k))
+            rows.extend((book_id, rank, other, score)
+                        for rank, (other, score) in enumerate(cursor.fetchall(), start=1))
+        cursor.executemany("DELETE FROM Recommendations WHERE Book_ID = ?", [(b,) for b in batch])
+        cursor.executemany("INSERT INTO Recommendations (Book_ID, Rank, Recommended_ID, Score) VALUES (?, ?, ?, ?)", rows)
+
+def build_recommendations(conn, cursor, full=False, top_k=TOP_K):
+    """
+    Process new loans (or all loans with full=True) and refresh the top K
+    lists of every book they touch. Returns (books re-ranked, last Loan_ID).
+    Use full=True after loans are deleted or merged, since counts only ever go up.
+    """
+    if full:
+        with conn:
+            cursor.execute("DELETE FROM Co_Borrowing")
+            cursor.execute("DELETE FROM Recommendations")
+            set_watermark(cursor, JOB_NAME, 0)
+
+    watermark = get_watermark(cursor, JOB_NAME)
+    cursor.execute("SELECT MAX(Loan_ID) FROM Loans")
+    last_id = max(cursor.fetchone()[0] or 0, watermark)
+
+    ranked = set()
+    for start in range(watermark, last_id, WINDOW_LOANS):
+        end = min(start + WINDOW_LOANS, last_id)
+        # One transaction per window: if the run stops, the next one starts at this window again.
+        with conn:
+            changed = update_pairs(cursor, start, end)
+            rank_books(cursor, changed, top_k)
+            set_watermark(cursor, JOB_NAME, end)
+        ranked |= changed
+    return len(ranked), last_id
+
+def main():
+    parser = argparse.ArgumentParser(description="Build co-borrowing recommendations from Loans.")
+    parser.add_argument("--full", action="store_true", help="rebuild from all loans instead of only new ones")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="neighbours kept per book")
+    parser.add_argument("--db", default="library_database.db")
+    args = parser.parse_args()
+
+    conn, cursor = connect_db(args.db)
+    ranked, last_id = build_recommendations(conn, cursor, args.full, args.top_k)
+    print(f"Re-ranked {ranked} books (loans processed up to Loan_ID {last_id}).")
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
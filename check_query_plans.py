@@ -0,0 +1,324 @@
+#============================================
+# Query plan regression guard.
+#
+# Collects every SQL statement written in the library programs, builds a
+# populated benchmark database for each one and runs EXPLAIN QUERY PLAN on
+# every statement. If a statement now does a full SCAN or needs a
+# TEMP B-TREE that it did not need in query_plan_baseline.json, we stop
+# with an error so the slow query is caught before it is shipped.
+# SQL built with an f-string can't be explained, so it is an error too
+# (apart from the schema/trigger helpers listed in DYNAMIC_SQL_ALLOWED).
+#
+#   python check_query_plans.py            -> check against the baseline
+#   python check_query_plans.py --update   -> accept the current plans
+#============================================
+
+import argparse
+import ast
+import importlib.util
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "query_plan_baseline.json")
+
+# Statements that start with one of these words are the ones the app runs.
+# The match is case sensitive: SQL is written in capitals in this project,
+# while prompts such as "Select a book:" are not.
+SQL_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+# An f-string that starts with one of these is SQL we can't check, so it fails
+# the guard unless the function that builds it is allowed below.
+DYNAMIC_SQL_KEYWORDS = SQL_KEYWORDS + ("CREATE", "ALTER", "DROP", "PRAGMA")
+DYNAMIC_SQL_ALLOWED = {
+    # Start-up schema changes on one named column.
+    ("UPDATED (EDITED)/Library_Database_Code.py", "add_missing_column"),
+    # Trigger DDL and the statements inside the trigger bodies.
+    ("UPDATED (EDITED)/Library_Database_Code.py", "stat_change"),
+    ("UPDATED (EDITED)/Library_Database_Code.py", "create_stats_triggers"),
+    ("UPDATED (EDITED)/Library_Database_Code.py", "create_change_log_triggers"),
+}
+
+# Plan lines we treat as "slow" (a full table scan or an extra sort).
+# "SCAN CONSTANT ROW" is a SELECT without a FROM (e.g. around subqueries), not a table.
+SLOW_MARKERS = ("SCAN ", "USE TEMP B-TREE")
+NOT_SLOW = ("SCAN CONSTANT ROW",)
+
+# How big the benchmark databases are. The planner only picks realistic
+# plans when the tables have realistic sizes and ANALYZE statistics.
+BENCH_AUTHORS = 500
+BENCH_BOOKS = 5000
+BENCH_BORROWERS = 1000
+BENCH_LOANS = 20000
+BENCH_LOCATIONS = 5000
+
+
+# ==========================================================
+# Benchmark databases
+# ==========================================================
+
+def load_module(relative_path, name):
+    """Import one of the programs by file path (their names contain spaces)."""
+    path = os.path.join(HERE, relative_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.pop(0)
+    return module
+
+
+FIRST_NAMES = ["Anna", "Ben", "Chloe", "David", "Ella", "Finn", "Grace", "Hemi", "Isla", "Jack"]
+SURNAMES = ["Smith", "Brown", "Wilson", "Taylor", "Ngata", "Walker", "Clarke", "Young",
+            "King", "Wright", "Scott", "Green", "Baker", "Adams", "Hall", "Allen"]
+
+
+def random_author(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}{rng.randint(1, 50)}"
+
+
+def random_date(rng):
+    return f"{rng.randint(2000, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def populate_standard(conn, module):
+    """Fill the single-table STANDARD schema with benchmark books."""
+    rng = random.Random(1)
+    genres = ["Fantasy", "Crime", "History", "Science", "Poetry", "Drama"]
+    conn.executemany(
+        "INSERT INTO Library_Database (Author, Title, Genre, Date_Published, Pages) VALUES (?, ?, ?, ?, ?)",
+        [(random_author(rng), f"Book {i}", rng.choice(genres),
+          f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1900, 2025)}",
+          rng.randint(50, 900))
+         for i in range(BENCH_BOOKS)],
+    )
+
+
+def populate_updated(conn, module):
+    """Fill the interconnected UPDATED schema with benchmark rows."""
+    rng = random.Random(1)
+    genres = ["Fantasy", "Crime", "History", "Science", "Poetry", "Drama"]
+    conn.executemany(
+        "INSERT INTO Authors (Author_Name, Country) VALUES (?, ?)",
+        [(random_author(rng), rng.choice(["NZ", "UK", "US", "AU"])) for _ in range(BENCH_AUTHORS)],
+    )
+    conn.executemany(
+        "INSERT INTO Library_database (Title, Genre, Date_Published, Pages, Author_ID, ISBN) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Book {i}", rng.choice(genres), random_date(rng), rng.randint(50, 900),
+          rng.randint(1, BENCH_AUTHORS), f"978{i:010d}")
+         for i in range(BENCH_BOOKS)],
+    )
+    conn.executemany(
+        "INSERT INTO Borrowers (Borrower_Name, Email, Phone) VALUES (?, ?, ?)",
+        [(f"Borrower {i}", f"borrower{i}@example.com", f"021{i:07d}") for i in range(BENCH_BORROWERS)],
+    )
+    loans = []
+    for _ in range(BENCH_LOANS):
+        loan_date = random_date(rng)
+        return_date = loan_date if rng.random() < 0.8 else None
+        loans.append((rng.randint(1, BENCH_BOOKS), rng.randint(1, BENCH_BORROWERS), loan_date, return_date,
+                      module.due_date_for(loan_date)))
+    conn.executemany(
+        "INSERT INTO Loans (Book_ID, Borrower_ID, Loan_Date, Return_Date, Due_Date) VALUES (?, ?, ?, ?, ?)",
+        loans,
+    )
+    conn.executemany(
+        "INSERT INTO Book_Locations (Book_ID, Location_Name, Copies, Barcode) VALUES (?, ?, ?, ?)",
+        [(rng.randint(1, BENCH_BOOKS), f"Shelf {rng.randint(1, 200)}", rng.randint(1, 5), f"C{i:08d}")
+         for i in range(BENCH_LOCATIONS)],
+    )
+
+
+# Each target is one program: the files whose SQL we collect, the module
+# that knows how to create its schema, and how to fill it with test data.
+TARGETS = [
+    {
+        "name": "STANDARD",
+        "sources": ["Library (STANDARD).py"],
+        "module": "Library (STANDARD).py",
+        "setup": "setup_database",
+        "populate": populate_standard,
+    },
+    {
+        "name": "UPDATED",
+        "sources": ["UPDATED (EDITED)/Library_Database_Code.py", "UPDATED (EDITED)/dedup.py",
+                    "UPDATED (EDITED)/recommendations.py", "UPDATED (EDITED)/overdue.py",
+                    "UPDATED (EDITED)/parallel_scan.py", "UPDATED (EDITED)/integrity_check.py"],
+        "module": "UPDATED (EDITED)/Library_Database_Code.py",
+        "setup": "connect_db",
+        "populate": populate_updated,
+    },
+]
+
+
+def build_benchmark_db(target, folder):
+    """Create the target's schema in a temporary file and populate it."""
+    module = load_module(target["module"], "bench_" + target["name"].lower())
+    db_path = os.path.join(folder, target["name"].lower() + ".db")
+    setup = getattr(module, target["setup"])
+    conn, _cursor = setup(db_path)
+    target["populate"](conn, module)
+    conn.commit()
+    conn.close()
+    # Run the setup again so any keys it fills in for older rows cover the benchmark rows too.
+    conn, _cursor = setup(db_path)
+    conn.execute("ANALYZE")
+    return conn
+
+
+# ==========================================================
+# Statement collection and plans
+# ==========================================================
+
+def normalise(sql):
+    """Collapse whitespace so formatting changes don't count as new statements."""
+    return " ".join(sql.split())
+
+
+def collect_statements(relative_path):
+    """
+    Return every SQL string literal in a source file, in order, without duplicates.
+    Pieces of f-strings are skipped here; dynamic_sql() reports those instead.
+    """
+    with open(os.path.join(HERE, relative_path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    fstring_parts = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+    statements = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in fstring_parts:
+            sql = normalise(node.value)
+            # A lone keyword (e.g. "UPDATE" naming a trigger event) is not a statement.
+            if " " in sql and sql.split(" ", 1)[0] in SQL_KEYWORDS and sql not in statements:
+                statements.append(sql)
+    return statements
+
+
+def dynamic_sql(relative_path):
+    """
+    Return a problem line for every f-string in a source file that starts like
+    SQL, unless the function building it is in DYNAMIC_SQL_ALLOWED.
+    """
+    with open(os.path.join(HERE, relative_path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    # Name of the innermost function around each f-string (ast.walk visits outer functions first).
+    function_of = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for inner in ast.walk(node):
+                function_of[id(inner)] = node.name
+
+    problems = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant)):
+            continue
+        words = node.values[0].value.split()
+        function = function_of.get(id(node), "<module>")
+        if words and words[0] in DYNAMIC_SQL_KEYWORDS and (relative_path, function) not in DYNAMIC_SQL_ALLOWED:
+            problems.append(f"unchecked dynamic SQL in {relative_path}:{node.lineno} ({function}):\n"
+                            f"    {normalise(ast.unparse(node))}")
+    return problems
+
+
+def explain(conn, sql):
+    """Return the plan detail lines for one statement (placeholders bound to NULL)."""
+    params = [None] * sql.count("?")
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[3] for row in rows]
+
+
+def slow_lines(plan):
+    return sorted({line for line in plan
+                   if any(m in line for m in SLOW_MARKERS) and line not in NOT_SLOW})
+
+
+def current_plans():
+    """Build every benchmark database and return {target: {sql: plan}}."""
+    plans = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for target in TARGETS:
+            conn = build_benchmark_db(target, folder)
+            target_plans = {}
+            for source in target["sources"]:
+                for sql in collect_statements(source):
+                    try:
+                        target_plans[sql] = explain(conn, sql)
+                    except sqlite3.Error as e:
+                        target_plans[sql] = [f"ERROR: {e}"]
+            conn.close()
+            plans[target["name"]] = target_plans
+    return plans
+
+
+# ==========================================================
+# Baseline comparison
+# ==========================================================
+
+def compare(baseline, plans):
+    """Return a list of problems: new slow plan lines, or statements that fail."""
+    problems = []
+    for name, target_plans in plans.items():
+        known = baseline.get(name, {})
+        for sql, plan in target_plans.items():
+            errors = [line for line in plan if line.startswith("ERROR:")]
+            if errors:
+                problems.append(f"[{name}] statement failed to prepare: {errors[0]}\n    {sql}")
+                continue
+            before = set(slow_lines(known[sql])) if sql in known else set()
+            added = [line for line in slow_lines(plan) if line not in before]
+            if added:
+                label = "plan regressed" if sql in known else "new statement is not indexed"
+                problems.append(f"[{name}] {label}: {', '.join(added)}\n    {sql}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check SQL query plans against the saved baseline.")
+    parser.add_argument("--update", action="store_true", help="save the current plans as the new baseline")
+    args = parser.parse_args()
+
+    # Statements built at run time never reach EXPLAIN, so they fail the guard outright.
+    dynamic = [problem for target in TARGETS for source in target["sources"] for problem in dynamic_sql(source)]
+    if dynamic:
+        print("SQL built with f-strings can't be checked:\n")
+        print("\n\n".join(dynamic))
+        print("\nWrite the statements out in full, or allow the function in DYNAMIC_SQL_ALLOWED.")
+        return 1
+
+    plans = current_plans()
+
+    if args.update:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(plans, f, indent=2, sort_keys=True)
+            f.write("\n")
+        count = sum(len(p) for p in plans.values())
+        print(f"Baseline updated with {count} statements.")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline found. Run with --update to create one.")
+        return 1
+
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    problems = compare(baseline, plans)
+    if problems:
+        print("Query plan regressions found:\n")
+        print("\n\n".join(problems))
+        print("\nFix the query/index, or run with --update if the new plan is intended.")
+        return 1
+
+    print("All query plans match the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())